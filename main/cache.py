@@ -0,0 +1,53 @@
+"""On-disk cache for LLM review responses."""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+def cache_key(*parts: str) -> str:
+    """Build a SHA-256 cache key from the parts that determine a response."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode()
+        # Length-prefix each part so different splits never collide
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """Content-addressed store of raw LLM responses, one file per key."""
+    
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.stats = {"hits": 0, "misses": 0}
+    
+    def _path(self, key: str) -> Path:
+        """Get the file path for a cache key."""
+        return self.directory / f"{key}.txt"
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss."""
+        try:
+            content = self._path(key).read_text()
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        
+        self.stats["hits"] += 1
+        return content
+    
+    def set(self, key: str, content: str) -> None:
+        """Store a response, replacing the file atomically."""
+        self.directory.mkdir(parents=True, exist_ok=True, mode=0o700)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(content)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -1,13 +1,23 @@
 """Command-line interface for phabricator-review."""
 
 import argparse
+import asyncio
 import sys
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 from zoneinfo import ZoneInfo
 
-from .config import get_config_path, load_config, load_dotenv_file, save_config
+from .cache import LLMCache
+from .config import (
+    Config,
+    get_cache_dir,
+    get_config_path,
+    get_socket_path,
+    load_config,
+    load_dotenv_file,
+    save_config,
+)
 from .constants import (
     COLOR_ADD,
     COLOR_NOTICE,
@@ -18,6 +28,7 @@ from .constants import (
     DEFAULT_MODEL,
     REVIEW_OUTPUT_DIR,
 )
+from .daemon import ReviewDaemon, request_review
 from .diff_parser import colorize, extract_code_snippet, summarize_diff
 from .phabricator import PhabricatorClient, RevisionInfo
 from .reviewer import CodeReviewer, ReviewResult
@@ -229,6 +240,17 @@ def cmd_config(args: argparse.Namespace) -> int:
     return 0
 
 
+def _make_reviewer(config: Config, model: str, use_cache: bool) -> CodeReviewer:
+    """Create an in-process reviewer for a single CLI run."""
+    return CodeReviewer(
+        config.openrouter_api_key,
+        model,
+        cache=LLMCache(get_cache_dir()),
+        requests_per_minute=config.requests_per_minute,
+        refresh_cache=not use_cache,
+    )
+
+
 def cmd_review(args: argparse.Namespace) -> int:
     """Handle the review command (default)."""
     try:
@@ -242,11 +264,22 @@ def cmd_review(args: argparse.Namespace) -> int:
     # Override model if specified via CLI
     model = getattr(args, "model", None) or config.model or DEFAULT_MODEL
     
-    # Fetch revision and diff from Phabricator
+    use_cache = not getattr(args, "no_cache", False)
+    
+    # A running daemon is already warm; only review in-process without one
+    socket_path = get_socket_path()
+    reviewer = None if socket_path.exists() else _make_reviewer(config, model, use_cache)
+    
+    # Fetch revision and diff from Phabricator while the LLM connection warms up
     try:
         client = PhabricatorClient(config.phabricator_url, config.phabricator_api_token)
-        revision, raw_diff = client.get_revision_diff(revision_id)
+        if reviewer:
+            revision, raw_diff = reviewer.prewarm_during(client.get_revision_diff, revision_id)
+        else:
+            revision, raw_diff = client.get_revision_diff(revision_id)
     except Exception as e:
+        if reviewer:
+            reviewer.close()
         print(colorize(f"❌ Error fetching diff: {e}", COLOR_REMOVE), file=sys.stderr)
         return 1
     
@@ -277,11 +310,28 @@ def cmd_review(args: argparse.Namespace) -> int:
     # Get LLM review
     review = None
     try:
-        reviewer = CodeReviewer(config.openrouter_api_key, model)
-        review = reviewer.review(raw_diff, change_summary, revision.summary)
+        if reviewer is None:
+            try:
+                review = request_review(
+                    socket_path,
+                    config.openrouter_api_key,
+                    raw_diff,
+                    change_summary,
+                    revision.summary,
+                    model,
+                    use_cache,
+                )
+            except OSError:
+                # Stale socket from a daemon that is no longer running
+                reviewer = _make_reviewer(config, model, use_cache)
+        if reviewer:
+            review = reviewer.review_sync(raw_diff, change_summary, revision.summary)
         review_output = format_review(review, raw_diff, show_snippets=True)
     except Exception as e:
         review_output = f"Failed to generate review: {e}"
+    finally:
+        if reviewer:
+            reviewer.close()
     
     output_lines.append("")
     output_lines.append(colorize("--- LLM Review ---", COLOR_SECTION))
@@ -309,6 +359,27 @@ def cmd_review(args: argparse.Namespace) -> int:
     return 0
 
 
+def cmd_daemon(args: argparse.Namespace) -> int:
+    """Handle the daemon command: serve reviews until interrupted."""
+    try:
+        config = load_config()
+    except ValueError as e:
+        print(colorize(f"❌ {e}", COLOR_REMOVE), file=sys.stderr)
+        return 1
+    
+    socket_path = get_socket_path()
+    print(colorize(f"Starting review daemon on {socket_path}", COLOR_ADD))
+    try:
+        asyncio.run(ReviewDaemon(config).serve(socket_path))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, RuntimeError) as e:
+        print(colorize(f"❌ {e}", COLOR_REMOVE), file=sys.stderr)
+        return 1
+    
+    return 0
+
+
 def main() -> int:
     """Main entry point for the CLI."""
     # Check if first arg is 'config' to use subcommand mode
@@ -328,11 +399,23 @@ def main() -> int:
         args = parser.parse_args(sys.argv[2:])
         return cmd_config(args)
     
+    if len(sys.argv) > 1 and sys.argv[1] == "daemon":
+        parser = argparse.ArgumentParser(
+            prog="phabreview daemon",
+            description="Serve reviews from a long-lived process that stays warm between runs",
+        )
+        
+        args = parser.parse_args(sys.argv[2:])
+        return cmd_daemon(args)
+    
     # Default: review mode
     parser = argparse.ArgumentParser(
         prog="phabreview",
         description="Review Phabricator revisions with LLM-powered code analysis",
-        epilog="Use 'phabreview config' to configure credentials.",
+        epilog=(
+            "Use 'phabreview config' to configure credentials and "
+            "'phabreview daemon' to keep a warm reviewer running."
+        ),
     )
     parser.add_argument("revision_id", nargs="?", help="Revision ID to review (e.g., D12345)")
     parser.add_argument(
@@ -349,6 +432,12 @@ def main() -> int:
         "--model",
         help=f"Override the LLM model for this review (default: {DEFAULT_MODEL})",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always query the LLM instead of reusing a cached review of the same diff "
+        "(the fresh review replaces the cached one)",
+    )
     
     args = parser.parse_args()
     
@@ -1,11 +1,22 @@
 """Configuration management for the phabricator-review tool."""
 
+import math
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
-from .constants import CONFIG_DIR_NAME, CONFIG_FILE_NAME
+from .constants import CACHE_DIR_NAME, CONFIG_DIR_NAME, CONFIG_FILE_NAME, DAEMON_SOCKET_NAME
+
+# (variable name, required) for every setting resolved by load_config
+_CONFIG_FIELDS = (
+    ("PHABRICATOR_URL", True),
+    ("PHABRICATOR_API_TOKEN", True),
+    ("OPENROUTER_API_KEY", True),
+    ("REVIEW_MODEL", False),
+    ("OPENROUTER_RPM", False),
+)
 
 
 @dataclass
@@ -15,10 +26,12 @@ class Config:
     phabricator_api_token: str
     openrouter_api_key: str
     model: Optional[str] = None
+    requests_per_minute: Optional[float] = None
 
 
+@lru_cache(maxsize=1)
 def get_config_path() -> Path:
-    """Get the path to the config file."""
+    """Get the path to the config file (resolved once per process)."""
     config_dir = os.environ.get("XDG_CONFIG_HOME")
     if not config_dir:
         config_dir = Path.home() / ".config"
@@ -28,20 +41,45 @@ def get_config_path() -> Path:
     return config_dir / CONFIG_DIR_NAME / CONFIG_FILE_NAME
 
 
+@lru_cache(maxsize=1)
+def get_cache_dir() -> Path:
+    """Get the directory for cached LLM responses (resolved once per process)."""
+    cache_dir = os.environ.get("XDG_CACHE_HOME")
+    if not cache_dir:
+        cache_dir = Path.home() / ".cache"
+    else:
+        cache_dir = Path(cache_dir)
+    
+    return cache_dir / CONFIG_DIR_NAME / CACHE_DIR_NAME
+
+
+@lru_cache(maxsize=1)
+def get_socket_path() -> Path:
+    """Get the path of the review daemon's Unix socket (resolved once per process)."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtime_dir:
+        # No per-user runtime dir; fall back to the private cache directory
+        return get_cache_dir().parent / DAEMON_SOCKET_NAME
+    
+    return Path(runtime_dir) / CONFIG_DIR_NAME / DAEMON_SOCKET_NAME
+
+
 def load_dotenv_file(path: Path) -> dict[str, str]:
     """Load a .env file and return a dict of key-value pairs."""
     env_vars = {}
-    if not path.exists():
+    try:
+        text = path.read_text()
+    except FileNotFoundError:
         return env_vars
     
-    with open(path) as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            if "=" in line:
-                key, _, value = line.partition("=")
-                env_vars[key.strip()] = value.strip()
+    for line in text.splitlines():
+        line = line.lstrip()
+        if not line or line[0] == "#":
+            continue
+        eq = line.find("=")
+        if eq < 0:
+            continue
+        env_vars[line[:eq].rstrip()] = line[eq + 1:].strip()
     
     return env_vars
 
@@ -58,19 +96,15 @@ def load_config() -> Config:
     config_vars.update(local_vars)
     
     # Environment variables override everything
-    phabricator_url = os.environ.get("PHABRICATOR_URL") or config_vars.get("PHABRICATOR_URL", "")
-    phabricator_api_token = os.environ.get("PHABRICATOR_API_TOKEN") or config_vars.get("PHABRICATOR_API_TOKEN", "")
-    openrouter_api_key = os.environ.get("OPENROUTER_API_KEY") or config_vars.get("OPENROUTER_API_KEY", "")
-    model = os.environ.get("REVIEW_MODEL") or config_vars.get("REVIEW_MODEL")
+    env_get = os.environ.get
+    vars_get = config_vars.get
+    resolved = {
+        key: env_get(key) or vars_get(key, "" if required else None)
+        for key, required in _CONFIG_FIELDS
+    }
     
     # Validate required fields
-    missing = []
-    if not phabricator_url:
-        missing.append("PHABRICATOR_URL")
-    if not phabricator_api_token:
-        missing.append("PHABRICATOR_API_TOKEN")
-    if not openrouter_api_key:
-        missing.append("OPENROUTER_API_KEY")
+    missing = [key for key, required in _CONFIG_FIELDS if required and not resolved[key]]
     
     if missing:
         raise ValueError(
@@ -78,11 +112,23 @@ def load_config() -> Config:
             f"Run 'phabreview config' to set them."
         )
     
+    requests_per_minute = None
+    rpm = resolved["OPENROUTER_RPM"]
+    if rpm:
+        error = f"OPENROUTER_RPM must be a finite, non-negative number, got {rpm!r}"
+        try:
+            requests_per_minute = float(rpm)
+        except ValueError:
+            raise ValueError(error) from None
+        if not (math.isfinite(requests_per_minute) and requests_per_minute >= 0):
+            raise ValueError(error)
+    
     return Config(
-        phabricator_url=phabricator_url,
-        phabricator_api_token=phabricator_api_token,
-        openrouter_api_key=openrouter_api_key,
-        model=model,
+        phabricator_url=resolved["PHABRICATOR_URL"],
+        phabricator_api_token=resolved["PHABRICATOR_API_TOKEN"],
+        openrouter_api_key=resolved["OPENROUTER_API_KEY"],
+        model=resolved["REVIEW_MODEL"],
+        requests_per_minute=requests_per_minute,
     )
 
 
@@ -6,6 +6,52 @@ OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
 
 DEFAULT_MODEL = "xiaomi/mimo-v2-flash:free"
 
+# OpenRouter model prefixes known to honor response_format={"type": "json_object"}
+JSON_MODE_MODEL_PREFIXES = ("openai/", "google/gemini-")
+
+# OpenRouter models that support strict json_schema structured outputs. Exact
+# IDs, since older snapshots (e.g. openai/gpt-4o-2024-05-13) do not.
+STRUCTURED_OUTPUT_MODELS = (
+    "openai/gpt-4o",
+    "openai/gpt-4o-2024-08-06",
+    "openai/gpt-4o-2024-11-20",
+    "openai/gpt-4o-mini",
+    "openai/gpt-4o-mini-2024-07-18",
+    "openai/gpt-4.1",
+    "openai/gpt-4.1-mini",
+    "openai/gpt-4.1-nano",
+    "openai/gpt-5",
+    "openai/gpt-5-mini",
+    "openai/gpt-5-nano",
+)
+
+# Maximum number of LLM reviews in flight at once for batched reviews
+REVIEW_MAX_CONCURRENCY = 20
+
+# Replies at least this many characters long are parsed in a worker thread
+REVIEW_THREADED_PARSE_MIN_SIZE = 64 * 1024
+
+# Default request budgets (overridden by OPENROUTER_RPM); requests beyond the
+# budget wait for the bucket to refill. OpenRouter caps :free models at ~20 rpm.
+REVIEW_REQUESTS_PER_MINUTE = 500
+FREE_MODEL_REQUESTS_PER_MINUTE = 20
+
+# Retries for rate-limited (429), overloaded (5xx) and dropped requests.
+# The OpenAI SDK backs off exponentially with jitter and honors Retry-After.
+OPENROUTER_MAX_RETRIES = 5
+
+# Connection pool limits for each OpenRouter HTTP client
+OPENROUTER_MAX_CONNECTIONS = 200
+OPENROUTER_MAX_KEEPALIVE_CONNECTIONS = 100
+
+# Timeout (seconds) for the best-effort connection prewarm request
+OPENROUTER_PREWARM_TIMEOUT = 2.0
+
+# Phabricator HTTP settings (timeouts in seconds)
+PHABRICATOR_CONNECT_TIMEOUT = 3
+PHABRICATOR_READ_TIMEOUT = 30
+PHABRICATOR_POOL_SIZE = 4
+
 # Terminal colors
 COLOR_TITLE = "\033[96m"
 COLOR_SECTION = "\033[95m"
@@ -18,5 +64,18 @@ COLOR_RESET = "\033[0m"
 CONFIG_DIR_NAME = "phab-reviewer"
 CONFIG_FILE_NAME = "config.env"
 
+# Cached LLM responses live under $XDG_CACHE_HOME/<CONFIG_DIR_NAME>/
+CACHE_DIR_NAME = "responses"
+
+# Unix socket of the review daemon, under $XDG_RUNTIME_DIR/<CONFIG_DIR_NAME>/
+DAEMON_SOCKET_NAME = "reviewer.sock"
+
+# Review daemon client timeouts (seconds); a reply waits on a full LLM review
+DAEMON_CONNECT_TIMEOUT = 2
+DAEMON_REPLY_TIMEOUT = 300
+
+# Seconds a daemon reviewer may sit idle before its connection pool is closed
+DAEMON_IDLE_TIMEOUT = 600
+
 # Review output directory
 REVIEW_OUTPUT_DIR = str(Path.home() / "Documents" / "Phabreview")
@@ -0,0 +1,229 @@
+"""Long-lived review daemon and its client, talking over a Unix socket.
+
+Each connection carries one request and one reply, both a single line of
+JSON. The daemon keeps one warm CodeReviewer per API key and model, so
+repeated CLI runs reuse its connection pool and caches instead of starting
+cold; reviewers left idle for DAEMON_IDLE_TIMEOUT are closed. Callers send
+their own API key, so usage is billed to the key they configured; the
+socket is private to the user (mode 0600).
+"""
+
+import asyncio
+import json
+import socket
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from .cache import LLMCache
+from .config import Config, get_cache_dir
+from .constants import (
+    DAEMON_CONNECT_TIMEOUT,
+    DAEMON_IDLE_TIMEOUT,
+    DAEMON_REPLY_TIMEOUT,
+    DEFAULT_MODEL,
+)
+from .reviewer import (
+    CodeReviewer,
+    RateLimiter,
+    RequestedChange,
+    ReviewJob,
+    ReviewResult,
+    default_requests_per_minute,
+)
+
+# Requests carry whole diffs, which can exceed asyncio's 64 KiB line limit
+_STREAM_LIMIT = 64 * 1024 * 1024
+
+
+@dataclass
+class _Worker:
+    """A warm reviewer and the task serving its job queue."""
+    reviewer: CodeReviewer
+    queue: asyncio.Queue
+    task: asyncio.Task
+    active: int = 0  # requests waiting on a reply
+    last_used: float = field(default_factory=time.monotonic)
+    
+    async def stop(self) -> None:
+        """Cancel the worker and close its reviewer's connection pool."""
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        await self.reviewer.aclose()
+
+
+class ReviewDaemon:
+    """Serves review requests from a Unix socket."""
+    
+    def __init__(self, config: Config):
+        self.config = config
+        self._workers: dict[tuple[str, str], _Worker] = {}
+        self._limiters: dict[tuple[str, float], RateLimiter] = {}
+    
+    def _get_worker(self, api_key: str, model: str) -> _Worker:
+        """Get the worker for a key and model, starting it on first use."""
+        worker = self._workers.get((api_key, model))
+        if worker is None:
+            reviewer = CodeReviewer(
+                api_key,
+                model,
+                cache=LLMCache(get_cache_dir()),
+                requests_per_minute=self.config.requests_per_minute,
+                rate_limiter=self._get_limiter(api_key, model),
+            )
+            queue = asyncio.Queue()
+            task = asyncio.create_task(reviewer.serve_forever(queue))
+            worker = self._workers[(api_key, model)] = _Worker(reviewer, queue, task)
+        return worker
+    
+    async def _expire_idle_workers(self) -> None:
+        """Close workers that have had no requests for DAEMON_IDLE_TIMEOUT."""
+        while True:
+            await asyncio.sleep(DAEMON_IDLE_TIMEOUT / 4)
+            now = time.monotonic()
+            for key, worker in list(self._workers.items()):
+                if not worker.active and now - worker.last_used >= DAEMON_IDLE_TIMEOUT:
+                    del self._workers[key]
+                    await worker.stop()
+    
+    def _get_limiter(self, api_key: str, model: str) -> Optional[RateLimiter]:
+        """Get the rate limiter shared by a key's reviewers with the same budget."""
+        rpm = self.config.requests_per_minute
+        if rpm is None:
+            rpm = default_requests_per_minute(model)
+        if not rpm:
+            return None
+        
+        limiter = self._limiters.get((api_key, rpm))
+        if limiter is None:
+            limiter = self._limiters[(api_key, rpm)] = RateLimiter(rpm)
+        return limiter
+    
+    async def _handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Answer a single review request."""
+        try:
+            request = json.loads(await reader.readline())
+            api_key = request.get("api_key") or self.config.openrouter_api_key
+            model = request.get("model") or self.config.model or DEFAULT_MODEL
+            job = ReviewJob(
+                diff=request["diff"],
+                reply=asyncio.get_running_loop().create_future(),
+                change_summary=request.get("change_summary", ""),
+                revision_summary=request.get("revision_summary", ""),
+                use_cache=request.get("use_cache", True),
+            )
+            
+            worker = self._get_worker(api_key, model)
+            worker.active += 1
+            try:
+                await worker.queue.put(job)
+                response = {"result": asdict(await job.reply)}
+            finally:
+                worker.active -= 1
+                worker.last_used = time.monotonic()
+        except Exception as e:
+            response = {"error": str(e) or type(e).__name__}
+        
+        try:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            # The client went away; nothing left to tell it
+            pass
+    
+    async def serve(self, socket_path: Path) -> None:
+        """Listen on socket_path until cancelled."""
+        if _is_listening(socket_path):
+            raise RuntimeError(f"A review daemon is already listening on {socket_path}")
+        
+        # Anything left at the path is a stale socket from a dead daemon
+        socket_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        socket_path.unlink(missing_ok=True)
+        
+        server = await asyncio.start_unix_server(
+            self._handle_connection, path=str(socket_path), limit=_STREAM_LIMIT
+        )
+        socket_path.chmod(0o600)
+        expiry = asyncio.create_task(self._expire_idle_workers())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            expiry.cancel()
+            for worker in self._workers.values():
+                await worker.stop()
+            self._workers.clear()
+            socket_path.unlink(missing_ok=True)
+
+
+def _is_listening(socket_path: Path) -> bool:
+    """Check whether a daemon is accepting connections on socket_path."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+def request_review(
+    socket_path: Path,
+    api_key: str,
+    diff: str,
+    change_summary: str = "",
+    revision_summary: str = "",
+    model: Optional[str] = None,
+    use_cache: bool = True,
+) -> ReviewResult:
+    """Ask a running daemon to review a diff.
+    
+    Raises OSError only when no daemon accepts the connection, so callers
+    can safely review in-process instead. Once the request is sent, failures
+    (including no reply within DAEMON_REPLY_TIMEOUT) raise RuntimeError: the
+    daemon may still be working on, and paying for, that review.
+    """
+    request = {
+        "api_key": api_key,
+        "diff": diff,
+        "change_summary": change_summary,
+        "revision_summary": revision_summary,
+        "model": model,
+        "use_cache": use_cache,
+    }
+    
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(DAEMON_CONNECT_TIMEOUT)
+        sock.connect(str(socket_path))
+        # A wedged daemon must not hang the caller forever
+        sock.settimeout(DAEMON_REPLY_TIMEOUT)
+        try:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        except TimeoutError:
+            raise RuntimeError(
+                f"Review daemon did not reply within {DAEMON_REPLY_TIMEOUT} seconds"
+            ) from None
+        except OSError as e:
+            raise RuntimeError(f"Lost connection to the review daemon: {e}") from e
+    
+    if not line:
+        raise RuntimeError("Review daemon closed the connection without replying")
+    
+    response = json.loads(line)
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    
+    data = response["result"]
+    return ReviewResult(
+        summary=data["summary"],
+        requested_changes=[RequestedChange(**rc) for rc in data["requested_changes"]],
+        raw_response=data["raw_response"],
+    )
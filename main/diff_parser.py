@@ -2,7 +2,8 @@
 
 import re
 from dataclasses import dataclass
-from typing import List, Tuple
+from io import StringIO
+from typing import Callable, Iterator, List, Optional, Tuple
 
 from .constants import (
     COLOR_ADD,
@@ -12,17 +13,24 @@ from .constants import (
     COLOR_TITLE,
 )
 
+_DIFF_HEADER_RE = re.compile(r"^diff --git a/(.+) b/(.+)$")
 
-@dataclass
+# Pre-rendered pieces of a summary group header: "  - Added <line label>:"
+_ADD_PREFIX = f"  - {COLOR_ADD}Added{COLOR_RESET} {COLOR_NOTICE}"
+_REMOVE_PREFIX = f"  - {COLOR_REMOVE}Removed{COLOR_RESET} {COLOR_NOTICE}"
+_LABEL_SUFFIX = f"{COLOR_RESET}:\n"
+
+
+@dataclass(slots=True)
 class ChangeEntry:
     """Represents a single line change in a diff."""
     path: str
     line: int
     change_type: str  # "add" or "remove"
-    content: str
+    content: str  # line text without the diff prefix, unstripped
 
 
-@dataclass
+@dataclass(slots=True)
 class GroupedChange:
     """Represents a group of consecutive changes of the same type."""
     start_line: int
@@ -36,138 +44,195 @@ def colorize(text: str, color: str) -> str:
     return f"{color}{text}{COLOR_RESET}"
 
 
-def group_entries(entries: List[ChangeEntry]) -> List[GroupedChange]:
-    """Group consecutive entries of the same type."""
-    if not entries:
-        return []
-    
-    groups = []
-    current = GroupedChange(
-        start_line=entries[0].line,
-        end_line=entries[0].line,
-        change_type=entries[0].change_type,
-        content=[entries[0].content],
-    )
-    
-    for entry in entries[1:]:
-        if entry.change_type == current.change_type and entry.line == current.end_line + 1:
-            current.end_line = entry.line
-            current.content.append(entry.content)
-        else:
-            groups.append(current)
-            current = GroupedChange(
-                start_line=entry.line,
-                end_line=entry.line,
-                change_type=entry.change_type,
-                content=[entry.content],
-            )
-    
-    groups.append(current)
-    return groups
+def _iter_lines(text: str) -> Iterator[str]:
+    """Yield the lines of text one at a time without building a full list."""
+    start = 0
+    n = len(text)
+    while start < n:
+        end = text.find("\n", start)
+        if end == -1:
+            end = n
+        yield text[start:end].rstrip("\r")
+        start = end + 1
 
 
-def summarize_diff(raw: str) -> Tuple[List[ChangeEntry], str]:
-    """Parse a unified diff and return change entries and a formatted summary."""
-    diff_header = re.compile(r"^diff --git a/(.+) b/(.+)$")
-    hunk_header = re.compile(r"^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@")
-    
-    summaries: dict = {}
-    order: List[str] = []
+def _parse_range_start(token: str, sign: str) -> Optional[int]:
+    """Parse a hunk range token like "-12,4" or "+7" and return its start line."""
+    if token[:1] != sign:
+        return None
+    start, sep, count = token[1:].partition(",")
+    if not start.isdecimal() or (sep and not count.isdecimal()):
+        return None
+    return int(start)
+
+
+def parse_hunk_header(line: str) -> Optional[Tuple[int, int]]:
+    """Parse a hunk header and return (old_start, new_start), or None if malformed."""
+    parts = line.split(" ", 3)
+    if len(parts) < 4 or parts[0] != "@@" or not parts[3].startswith("@@"):
+        return None
+    old_start = _parse_range_start(parts[1], "-")
+    new_start = _parse_range_start(parts[2], "+")
+    if old_start is None or new_start is None:
+        return None
+    return old_start, new_start
+
+
+def _write_group(write: Callable[[str], int], grp: GroupedChange) -> None:
+    """Write one formatted change group to the summary buffer."""
+    start, end = grp.start_line, grp.end_line
+    prefix = _REMOVE_PREFIX if grp.change_type == "remove" else _ADD_PREFIX
+    if start == end:
+        write(f"{prefix}line {start}{_LABEL_SUFFIX}")
+    else:
+        write(f"{prefix}lines {start}-{end}{_LABEL_SUFFIX}")
+    for content in grp.content:
+        write(f"      {content}\n")
+
+
+def parse_entries(raw: str) -> List[ChangeEntry]:
+    """Parse a unified diff into one ChangeEntry per added or removed line."""
     current_path: str | None = None
     old_line = 0
     new_line = 0
     results: List[ChangeEntry] = []
     
-    for line in raw.splitlines():
+    # Local bindings for names used on every line
+    append = results.append
+    match_diff_header = _DIFF_HEADER_RE.match
+    parse_hunk = parse_hunk_header
+    
+    for line in _iter_lines(raw):
+        first = line[:1]
+        
         # Check for diff header
-        match = diff_header.match(line)
-        if match:
-            path = match.group(2)
-            if path == "/dev/null":
-                path = match.group(1)
-            if path not in summaries:
-                summaries[path] = []
-                order.append(path)
-            current_path = path
-            old_line, new_line = 0, 0
-            continue
+        if first == "d" and line.startswith("diff --git "):
+            match = match_diff_header(line)
+            if match:
+                path = match.group(2)
+                if path == "/dev/null":
+                    path = match.group(1)
+                current_path = path
+                old_line, new_line = 0, 0
+                continue
         
         if current_path is None:
             continue
         
         # Check for hunk header
-        match = hunk_header.match(line)
-        if match:
-            old_line = int(match.group(1))
-            new_line = int(match.group(2))
-            continue
-        
-        if not line or line == "\\ No newline at end of file":
-            continue
-        
-        prefix = line[0] if line else " "
+        if first == "@":
+            hunk = parse_hunk(line)
+            if hunk:
+                old_line, new_line = hunk
+                continue
         
-        if prefix == " ":
+        # Empty lines and "\\ No newline at end of file" match no prefix below
+        if first == " ":
             if old_line > 0:
                 old_line += 1
             if new_line > 0:
                 new_line += 1
-        elif prefix == "-":
+        elif first == "-":
             if old_line == 0:
                 continue
-            content = line[1:].strip() or "(empty)"
-            entry = ChangeEntry(
-                path=current_path,
-                line=old_line,
-                change_type="remove",
-                content=content,
+            append(
+                ChangeEntry(
+                    path=current_path,
+                    line=old_line,
+                    change_type="remove",
+                    content=line[1:],
+                )
             )
-            summaries[current_path].append(entry)
-            results.append(entry)
             old_line += 1
-        elif prefix == "+":
+        elif first == "+":
             if new_line == 0:
                 continue
-            content = line[1:].strip() or "(empty)"
-            entry = ChangeEntry(
-                path=current_path,
-                line=new_line,
-                change_type="add",
-                content=content,
+            append(
+                ChangeEntry(
+                    path=current_path,
+                    line=new_line,
+                    change_type="add",
+                    content=line[1:],
+                )
             )
-            summaries[current_path].append(entry)
-            results.append(entry)
             new_line += 1
     
-    # Build formatted summary
-    lines = []
-    for path in order:
-        entries = summaries[path]
-        if not entries:
+    return results
+
+
+def format_entries(entries: List[ChangeEntry]) -> str:
+    """Format change entries as a colored summary grouped by file and line range.
+    
+    Consecutive entries are grouped on the fly and each group is written as
+    soon as it can no longer grow.
+    """
+    buf = StringIO()
+    write = buf.write
+    write_group = _write_group
+    title, reset = COLOR_TITLE, COLOR_RESET
+    group: GroupedChange | None = None
+    group_path: str | None = None
+    
+    for entry in entries:
+        content = entry.content.strip() or "(empty)"
+        
+        # Extend the open group or flush it and start a new one
+        if (
+            group is not None
+            and entry.path == group_path
+            and entry.change_type == group.change_type
+            and entry.line == group.end_line + 1
+        ):
+            group.end_line = entry.line
+            group.content.append(content)
             continue
         
-        lines.append(colorize(path, COLOR_TITLE))
+        if group is not None:
+            write_group(write, group)
+        if entry.path != group_path:
+            write(f"{title}{entry.path}{reset}\n")
+            group_path = entry.path
+        group = GroupedChange(
+            start_line=entry.line,
+            end_line=entry.line,
+            change_type=entry.change_type,
+            content=[content],
+        )
+    
+    if group is not None:
+        write_group(write, group)
+    
+    return buf.getvalue().rstrip("\n")
+
+
+def summarize_diff(raw: str) -> Tuple[List[ChangeEntry], str]:
+    """Parse a unified diff and return change entries and a formatted summary."""
+    entries = parse_entries(raw)
+    return entries, format_entries(entries)
+
+
+def _find_file_block(raw_diff: str, file_path: str) -> Optional[str]:
+    """Return the section of raw_diff for file_path, from its header to the next one."""
+    needle = f" b/{file_path}"
+    pos = raw_diff.find(needle)
+    while pos >= 0:
+        line_start = raw_diff.rfind("\n", 0, pos) + 1
+        line_end = raw_diff.find("\n", pos)
+        if line_end == -1:
+            line_end = len(raw_diff)
         
-        for grp in group_entries(entries):
-            if grp.start_line == grp.end_line:
-                line_label = f"line {grp.start_line}"
-            else:
-                line_label = f"lines {grp.start_line}-{grp.end_line}"
-            
-            if grp.change_type == "remove":
-                action_color = COLOR_REMOVE
-                action_label = "Removed"
-            else:
-                action_color = COLOR_ADD
-                action_label = "Added"
-            
-            lines.append(
-                f"  - {colorize(action_label, action_color)} {colorize(line_label, COLOR_NOTICE)}:"
-            )
-            for content in grp.content:
-                lines.append(f"      {content}")
+        # Confirm the hit is a diff header whose new path is exactly file_path
+        if raw_diff.startswith("diff --git ", line_start):
+            match = _DIFF_HEADER_RE.match(raw_diff[line_start:line_end].rstrip("\r"))
+            if match and match.group(2) == file_path:
+                block_end = raw_diff.find("\ndiff --git ", line_end)
+                if block_end == -1:
+                    block_end = len(raw_diff)
+                return raw_diff[line_start:block_end]
+        
+        pos = raw_diff.find(needle, pos + 1)
     
-    return results, "\n".join(lines)
+    return None
 
 
 def extract_code_snippet(
@@ -203,42 +268,28 @@ def extract_code_snippet(
         except ValueError:
             return None
     
-    # Find the file section in the diff
-    diff_header = re.compile(r"^diff --git a/(.+) b/(.+)$")
-    hunk_header = re.compile(r"^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+    # Jump straight to the file section in the diff
+    block = _find_file_block(raw_diff, file_path)
+    if block is None:
+        return None
     
-    in_target_file = False
     current_new_line = 0
     collected_lines: list[tuple[int, str]] = []
     
-    for line in raw_diff.splitlines():
-        # Check for diff header
-        match = diff_header.match(line)
-        if match:
-            path = match.group(2)
-            if path == "/dev/null":
-                path = match.group(1)
-            in_target_file = (path == file_path)
-            continue
-        
-        if not in_target_file:
-            continue
+    for line in _iter_lines(block):
+        first = line[:1]
         
         # Check for hunk header
-        match = hunk_header.match(line)
-        if match:
-            current_new_line = int(match.group(2))
-            continue
-        
-        if not line:
-            continue
-        
-        prefix = line[0] if line else " "
+        if first == "@":
+            hunk = parse_hunk_header(line)
+            if hunk:
+                current_new_line = hunk[1]
+                continue
         
-        if prefix == "-":
+        if first == "-":
             # Removed lines don't affect new line numbers
             continue
-        elif prefix in (" ", "+"):
+        elif first == " " or first == "+":
             # Context or added lines
             if current_new_line > 0:
                 # Check if this line is in our target range (with context)
@@ -248,6 +299,9 @@ def extract_code_snippet(
                     marker = ">" if start_line <= current_new_line <= end_line else " "
                     collected_lines.append((current_new_line, f"{marker} {current_new_line}: {content}"))
                 current_new_line += 1
+                # Hunks are ordered, so nothing after the window can match
+                if collected_lines and current_new_line > end_line + context_lines:
+                    break
     
     if collected_lines:
         return "\n".join(line for _, line in collected_lines)
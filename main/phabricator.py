@@ -1,9 +1,26 @@
 """Phabricator API client."""
 
+import json
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from .constants import (
+    PHABRICATOR_CONNECT_TIMEOUT,
+    PHABRICATOR_POOL_SIZE,
+    PHABRICATOR_READ_TIMEOUT,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Use orjson when it is installed; both accept the raw response bytes
+_json_loads = orjson.loads if orjson else json.loads
 
 
 @dataclass
@@ -15,6 +32,7 @@ class RevisionInfo:
     uri: str
     summary: str
     diff_phid: str
+    diff_id: str = ""
 
 
 class PhabricatorClient:
@@ -26,16 +44,40 @@ class PhabricatorClient:
         if not self.base_url.endswith("/api"):
             self.base_url = f"{self.base_url}/api"
         self.api_token = api_token
+        
+        # Reuse one keep-alive connection pool across Conduit calls
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=PHABRICATOR_POOL_SIZE,
+            pool_maxsize=PHABRICATOR_POOL_SIZE,
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
     
-    def _post_conduit(self, endpoint: str, params: dict) -> dict:
-        """Make a POST request to a Conduit endpoint."""
-        params["api.token"] = self.api_token
-        url = f"{self.base_url}/{endpoint}"
+    def _post_conduit(self, endpoint: str, params: dict, stream: bool = False) -> dict:
+        """Make a POST request to a Conduit endpoint.
         
-        response = requests.post(url, data=params)
-        response.raise_for_status()
+        The body is decoded straight from bytes. With stream=True it is read
+        into one buffer from the socket, which suits large raw diffs.
+        """
+        url = f"{self.base_url}/{endpoint}"
         
-        data = response.json()
+        response = self._session.post(
+            url,
+            data={**params, "api.token": self.api_token},
+            stream=stream,
+            timeout=(PHABRICATOR_CONNECT_TIMEOUT, PHABRICATOR_READ_TIMEOUT),
+        )
+        # Close the response on every path so a streamed connection that
+        # errors out is still returned to the pool
+        with response:
+            response.raise_for_status()
+            if stream:
+                body = response.raw.read(decode_content=True)
+            else:
+                body = response.content
+        
+        data = _json_loads(body)
         if data.get("error_code"):
             raise Exception(
                 f"Phabricator error ({data['error_code']}): {data.get('error_info', 'Unknown error')}"
@@ -45,9 +87,12 @@ class PhabricatorClient:
     
     def get_revision(self, revision_id: str) -> RevisionInfo:
         """Fetch revision metadata by ID (e.g., 'D12345' or '12345')."""
-        clean_id = revision_id.strip()
-        if clean_id and clean_id[0].upper() == "D":
-            clean_id = clean_id[1:]
+        clean_id = revision_id
+        # Plain numeric IDs need no normalization
+        if not clean_id.isdigit():
+            clean_id = clean_id.strip()
+            if clean_id[:1] in ("D", "d"):
+                clean_id = clean_id[1:]
         
         if not clean_id.isdigit():
             raise ValueError(f"Invalid revision ID: {revision_id}")
@@ -55,6 +100,7 @@ class PhabricatorClient:
         params = {
             "constraints[ids][0]": clean_id,
             "attachments[reviewers]": "false",
+            "attachments[diffs]": "true",
         }
         
         data = self._post_conduit("differential.revision.search", params)
@@ -65,6 +111,15 @@ class PhabricatorClient:
         
         revision = results[0]
         fields = revision.get("fields", {})
+        diff_phid = fields.get("diffPHID", "")
+        
+        # Servers that return the diffs attachment save a diff.search call
+        diff_id = ""
+        diffs = revision.get("attachments", {}).get("diffs", {}).get("diffs", [])
+        for diff in diffs:
+            if diff.get("phid", diff_phid) == diff_phid:
+                diff_id = str(diff.get("id", ""))
+                break
         
         return RevisionInfo(
             id=clean_id,
@@ -72,30 +127,32 @@ class PhabricatorClient:
             status=fields.get("status", {}).get("name", "Unknown"),
             uri=fields.get("uri", ""),
             summary=fields.get("summary", ""),
-            diff_phid=fields.get("diffPHID", ""),
+            diff_phid=diff_phid,
+            diff_id=diff_id,
         )
     
-    def get_raw_diff(self, diff_phid: str) -> str:
-        """Fetch the raw diff content for a given diff PHID."""
-        # First, get the diff ID from the PHID
-        params = {
-            "constraints[phids][0]": diff_phid,
-        }
-        
-        data = self._post_conduit("differential.diff.search", params)
-        
-        results = data.get("result", {}).get("data", [])
-        if not results:
-            raise Exception(f"Diff {diff_phid} not found")
-        
-        diff_id = results[0].get("id")
+    def get_raw_diff(self, diff_phid: str, diff_id: str = "") -> str:
+        """Fetch the raw diff content for a given diff PHID (or known diff ID)."""
+        # First, get the diff ID from the PHID unless we already have it
+        if not diff_id:
+            params = {
+                "constraints[phids][0]": diff_phid,
+            }
+            
+            data = self._post_conduit("differential.diff.search", params)
+            
+            results = data.get("result", {}).get("data", [])
+            if not results:
+                raise Exception(f"Diff {diff_phid} not found")
+            
+            diff_id = results[0].get("id")
         
         # Now fetch the raw diff
         params = {
             "diffID": str(diff_id),
         }
         
-        data = self._post_conduit("differential.getrawdiff", params)
+        data = self._post_conduit("differential.getrawdiff", params, stream=True)
         
         return data.get("result", "")
     
@@ -103,9 +160,18 @@ class PhabricatorClient:
         """Fetch revision info and its raw diff."""
         revision = self.get_revision(revision_id)
         
-        if not revision.diff_phid:
+        if not revision.diff_phid and not revision.diff_id:
             raise Exception(f"No diff available for revision {revision_id}")
         
-        raw_diff = self.get_raw_diff(revision.diff_phid)
+        raw_diff = self.get_raw_diff(revision.diff_phid, revision.diff_id)
         
         return revision, raw_diff
+    
+    def get_revisions_diffs(
+        self,
+        revision_ids: list[str],
+        max_workers: int = PHABRICATOR_POOL_SIZE,
+    ) -> list[tuple[RevisionInfo, str]]:
+        """Fetch several revisions and their raw diffs concurrently, in input order."""
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(self.get_revision_diff, revision_ids))
@@ -57,17 +57,23 @@ Focus on issues that matter for code quality, maintainability, and correctness.
 
 
 def build_user_prompt(diff: str, change_summary: str, revision_summary: str = "") -> str:
-    """Build the user prompt with the diff and context."""
+    """Build the user prompt with the diff and context.
+    
+    Pieces are joined once so the (potentially large) diff is copied only
+    into the final string, never into an intermediate f-string.
+    """
     parts = []
     
     if revision_summary:
-        parts.append(f"**Revision Description:**\n{revision_summary}")
+        parts += ("**Revision Description:**\n", revision_summary, "\n\n")
     
     if change_summary:
-        parts.append(f"**Change Summary:**\n{change_summary}")
-    
-    parts.append(f"**Full Diff:**\n```diff\n{diff}\n```")
+        parts += ("**Change Summary:**\n", change_summary, "\n\n")
     
-    parts.append("\nPlease review this code change and provide your feedback in the specified JSON format.")
+    parts += (
+        "**Full Diff:**\n```diff\n",
+        diff,
+        "\n```\n\n\nPlease review this code change and provide your feedback in the specified JSON format.",
+    )
     
-    return "\n\n".join(parts)
+    return "".join(parts)
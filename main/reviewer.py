@@ -1,16 +1,140 @@
 """LLM-based code reviewer using OpenAI/OpenRouter."""
 
+import asyncio
 import json
+import re
+import time
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import AsyncIterator, Callable, List, Optional, Tuple, TypeVar
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, BadRequestError, DefaultAsyncHttpxClient
 
-from .constants import DEFAULT_MODEL, OPENROUTER_BASE_URL
+from .cache import LLMCache, cache_key
+from .constants import (
+    DEFAULT_MODEL,
+    FREE_MODEL_REQUESTS_PER_MINUTE,
+    JSON_MODE_MODEL_PREFIXES,
+    OPENROUTER_BASE_URL,
+    OPENROUTER_MAX_CONNECTIONS,
+    OPENROUTER_MAX_KEEPALIVE_CONNECTIONS,
+    OPENROUTER_MAX_RETRIES,
+    OPENROUTER_PREWARM_TIMEOUT,
+    REVIEW_MAX_CONCURRENCY,
+    REVIEW_REQUESTS_PER_MINUTE,
+    REVIEW_THREADED_PARSE_MIN_SIZE,
+    STRUCTURED_OUTPUT_MODELS,
+)
 from .prompts import SYSTEM_PROMPT, build_user_prompt
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-@dataclass
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either
+_json_loads = orjson.loads if orjson else json.loads
+
+T = TypeVar("T")
+
+# Start of the requested_changes array in a (possibly partial) reply
+_CHANGES_KEY = '"requested_changes"'
+_CHANGES_START_RE = re.compile(_CHANGES_KEY + r"\s*:\s*\[")
+_JSON_DECODER = json.JSONDecoder()
+
+# JSON schema of a review reply, sent to models with strict structured outputs
+_REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "array", "items": {"type": "string"}},
+        "requested_changes": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string"},
+                    "line": {"anyOf": [{"type": "integer"}, {"type": "string"}]},
+                    "change": {"type": "string"},
+                },
+                "required": ["path", "line", "change"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["summary", "requested_changes"],
+    "additionalProperties": False,
+}
+_STRUCTURED_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "ReviewResult", "schema": _REVIEW_SCHEMA, "strict": True},
+}
+_JSON_MODE_RESPONSE_FORMAT = {"type": "json_object"}
+
+# SYSTEM_PROMPT never changes, so every request shares one system message
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+
+def create_client(api_key: str) -> AsyncOpenAI:
+    """Create an OpenRouter client backed by a pooled HTTP connection.
+    
+    httpx connections are bound to the event loop that opened them, so the
+    client must only be used on one loop. The caller closes it.
+    """
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=OPENROUTER_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENROUTER_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    )
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=OPENROUTER_BASE_URL,
+        http_client=http_client,
+        max_retries=OPENROUTER_MAX_RETRIES,
+    )
+
+
+class RateLimiter:
+    """Token bucket allowing at most `rate` requests per `period` seconds."""
+    
+    def __init__(self, rate: float, period: float = 60.0):
+        # Hold at least one token so rates below one per period still release
+        # a request every period / rate seconds
+        self._capacity = max(rate, 1)
+        self._interval = period / rate
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+    
+    async def acquire(self) -> None:
+        """Wait until a request may start, then take its token."""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity, self._tokens + (now - self._updated) / self._interval
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) * self._interval)
+
+
+def _rejects_json_schema(error: BadRequestError) -> bool:
+    """Check whether a 400 is about the response format rather than the request."""
+    # Other 400s (context length, unknown model, moderation) must not disable
+    # structured outputs
+    message = f"{error.message} {error.body}".lower()
+    return "response_format" in message or "json_schema" in message
+
+
+def default_requests_per_minute(model: str) -> float:
+    """Get the request budget for a model when none is configured."""
+    if model.endswith(":free"):
+        return FREE_MODEL_REQUESTS_PER_MINUTE
+    return REVIEW_REQUESTS_PER_MINUTE
+
+
+@dataclass(slots=True, frozen=True)
 class RequestedChange:
     """A single requested change from the review."""
     path: str
@@ -18,7 +142,7 @@ class RequestedChange:
     change: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ReviewResult:
     """The result of a code review."""
     summary: List[str]
@@ -26,80 +150,493 @@ class ReviewResult:
     raw_response: Optional[str] = None
 
 
+@dataclass(slots=True)
+class ReviewJob:
+    """A queued review request; its result or error is set on `reply`."""
+    diff: str
+    reply: asyncio.Future
+    change_summary: str = ""
+    revision_summary: str = ""
+    use_cache: bool = True
+
+
+def _fallback_review(content: str) -> ReviewResult:
+    """Wrap a reply that is not a JSON review as a plain summary."""
+    return ReviewResult(
+        summary=[content] if content else ["(model returned empty response)"],
+        requested_changes=[],
+        raw_response=content,
+    )
+
+
+def _unwrap_fence(content: str) -> str:
+    """Return the body of a reply optionally wrapped in a ```json fence.
+    
+    The closing fence is optional so truncated replies still parse. Bounds
+    are found by index so the body is sliced out exactly once.
+    """
+    n = len(content)
+    start = 0
+    while start < n and content[start].isspace():
+        start += 1
+    if not content.startswith("```", start):
+        return content.strip()
+    
+    start += 3
+    if content.startswith(("json", "JSON"), start):
+        start += 4
+    while start < n and content[start].isspace():
+        start += 1
+    
+    end = n
+    while end > start and content[end - 1].isspace():
+        end -= 1
+    if content.endswith("```", start, end):
+        end -= 3
+        while end > start and content[end - 1].isspace():
+            end -= 1
+    
+    return content[start:end]
+
+
+def _review_from_data(data: object, raw_response: str) -> ReviewResult:
+    """Validate decoded review JSON and build a ReviewResult in one pass.
+    
+    Raises ValueError when the data does not match the review schema.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Review must be a JSON object")
+    
+    summary = data.get("summary") or []
+    if isinstance(summary, str):
+        summary = [summary]
+    elif not isinstance(summary, list):
+        raise ValueError("Review summary must be a string or a list")
+    
+    changes = data.get("requested_changes") or []
+    if not isinstance(changes, list) or not all(isinstance(rc, dict) for rc in changes):
+        raise ValueError("Review requested_changes must be a list of objects")
+    
+    return ReviewResult(
+        summary=summary,
+        requested_changes=[
+            RequestedChange(
+                path=rc.get("path", ""),
+                line=rc.get("line", ""),
+                change=rc.get("change", ""),
+            )
+            for rc in changes
+        ],
+        raw_response=raw_response,
+    )
+
+
+class _ChangeStreamParser:
+    """Incrementally pull requested_changes items out of a streamed JSON reply.
+    
+    The parser owns the streamed text: deltas are kept in a list and joined
+    once by `text`, while only the not yet scanned tail is held as a string.
+    """
+    
+    def __init__(self):
+        self._parts: List[str] = []
+        self._tail = ""
+        self._open = False  # whether the requested_changes array has started
+        self._done = False
+    
+    @property
+    def text(self) -> str:
+        """The full reply received so far."""
+        return "".join(self._parts)
+    
+    def feed(self, text: str) -> List[RequestedChange]:
+        """Add streamed text and return the requested changes it completed."""
+        self._parts.append(text)
+        if self._done:
+            return []
+        
+        buf = self._tail + text
+        pos = 0
+        if not self._open:
+            match = _CHANGES_START_RE.search(buf)
+            if not match:
+                # Keep only what may still become the start of the array
+                start = buf.rfind(_CHANGES_KEY)
+                if start < 0:
+                    # A key split across deltas is shorter than the whole key
+                    start = max(len(buf) - len(_CHANGES_KEY) + 1, 0)
+                self._tail = buf[start:]
+                return []
+            self._open = True
+            pos = match.end()
+        
+        changes = []
+        n = len(buf)
+        while True:
+            # Skip whitespace and commas between array items
+            while pos < n and buf[pos] in " \t\r\n,":
+                pos += 1
+            
+            if pos >= n:
+                break
+            if buf[pos] == "]":
+                self._done = True
+                break
+            if buf.find("}", pos) == -1:
+                break
+            
+            try:
+                item, pos = _JSON_DECODER.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # The item is still incomplete; wait for more text
+                break
+            
+            if isinstance(item, dict):
+                changes.append(
+                    RequestedChange(
+                        path=item.get("path", ""),
+                        line=item.get("line", ""),
+                        change=item.get("change", ""),
+                    )
+                )
+        
+        self._tail = "" if self._done else buf[pos:]
+        return changes
+
+
 class CodeReviewer:
     """Reviews code diffs using LLM via OpenRouter."""
     
-    def __init__(self, api_key: str, model: Optional[str] = None):
-        self.client = OpenAI(api_key=api_key, base_url=OPENROUTER_BASE_URL)
+    def __init__(
+        self,
+        api_key: str,
+        model: Optional[str] = None,
+        client: Optional[AsyncOpenAI] = None,
+        cache: Optional[LLMCache] = None,
+        json_mode: Optional[bool] = None,
+        structured_output: Optional[bool] = None,
+        requests_per_minute: Optional[float] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        refresh_cache: bool = False,
+    ):
+        self.api_key = api_key
         self.model = model or DEFAULT_MODEL
+        self.cache = cache
+        # Skip cache lookups but still store fresh replies
+        self.refresh_cache = refresh_cache
+        # Both modes guarantee a bare JSON reply; auto-detect from the model name
+        if structured_output is None:
+            structured_output = self.model in STRUCTURED_OUTPUT_MODELS
+        if json_mode is None:
+            json_mode = self.model.startswith(JSON_MODE_MODEL_PREFIXES)
+        self.supports_structured_output = structured_output
+        self.supports_json_mode = json_mode
+        
+        # Everything but the user message is fixed per reviewer; build it once
+        self._request_options = {"model": self.model, "stream": True}
+        if structured_output:
+            self._request_options["response_format"] = _STRUCTURED_RESPONSE_FORMAT
+        elif json_mode:
+            self._request_options["response_format"] = _JSON_MODE_RESPONSE_FORMAT
+        
+        self._client = client
+        # Client created (and closed) by this reviewer when none is injected
+        self._own_client: Optional[AsyncOpenAI] = None
+        self._own_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[asyncio.Runner] = None
+        # An injected limiter shares one budget across reviewers. Otherwise a
+        # budget of None picks the model's default and 0 disables limiting.
+        if rate_limiter is None:
+            if requests_per_minute is None:
+                requests_per_minute = default_requests_per_minute(self.model)
+            if requests_per_minute:
+                rate_limiter = RateLimiter(requests_per_minute)
+        self._limiter = rate_limiter
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        """The injected client, or this reviewer's own one for the running loop."""
+        if self._client is not None:
+            return self._client
+        
+        loop = asyncio.get_running_loop()
+        if self._own_client is None or self._own_client_loop is not loop:
+            self._own_client = create_client(self.api_key)
+            self._own_client_loop = loop
+        return self._own_client
+    
+    async def aclose(self) -> None:
+        """Close the client this reviewer created, if any."""
+        client, loop = self._own_client, self._own_client_loop
+        self._own_client = self._own_client_loop = None
+        # A client left on another (likely finished) loop cannot be closed here
+        if client is not None and loop is asyncio.get_running_loop():
+            await client.close()
+    
+    async def __aenter__(self) -> "CodeReviewer":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
+    def _get_runner(self) -> asyncio.Runner:
+        """Get the event loop runner used by the synchronous wrappers."""
+        # Keep one event loop per reviewer so pooled connections stay usable
+        if self._runner is None:
+            self._runner = asyncio.Runner()
+        return self._runner
     
-    def review(
+    async def prewarm(self) -> None:
+        """Open a keep-alive connection to OpenRouter ahead of the first review.
+        
+        Best effort: any failure is ignored and review() connects as usual.
+        """
+        client = self.client.with_options(timeout=OPENROUTER_PREWARM_TIMEOUT, max_retries=0)
+        try:
+            # Cheapest authenticated endpoint; the reply body is tiny
+            await client.get("/key", cast_to=httpx.Response)
+        except Exception:
+            pass
+    
+    def prewarm_during(self, func: Callable[..., T], *args) -> T:
+        """Call blocking func(*args) in a thread while prewarm() runs.
+        
+        Lets synchronous callers hide the OpenRouter handshake behind other
+        I/O, such as fetching the diff from Phabricator.
+        """
+        async def run() -> T:
+            result, _ = await asyncio.gather(asyncio.to_thread(func, *args), self.prewarm())
+            return result
+        
+        return self._get_runner().run(run())
+    
+    def _cache_key(self, user_prompt: str) -> str:
+        """Get the response cache key for a prompt sent to this model."""
+        # Requests use the provider's default sampling settings, so identical
+        # prompts for the same model can safely share a cached response.
+        return cache_key(self.model, SYSTEM_PROMPT, user_prompt)
+    
+    async def _stream_content(self, user_prompt: str) -> AsyncIterator[str]:
+        """Yield the model's reply text as it streams in."""
+        if self._limiter:
+            await self._limiter.acquire()
+        
+        messages = [_SYSTEM_MESSAGE, {"role": "user", "content": user_prompt}]
+        try:
+            stream = await self.client.chat.completions.create(
+                messages=messages, **self._request_options
+            )
+        except BadRequestError as e:
+            if not (self.supports_structured_output and _rejects_json_schema(e)):
+                raise
+            # The model rejected json_schema; use JSON mode from now on
+            self.supports_structured_output = False
+            self.supports_json_mode = True
+            self._request_options["response_format"] = _JSON_MODE_RESPONSE_FORMAT
+            if self._limiter:
+                await self._limiter.acquire()
+            stream = await self.client.chat.completions.create(
+                messages=messages, **self._request_options
+            )
+        
+        # Close the stream even if the consumer stops iterating early
+        async with stream:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+    
+    def _parse(self, content: str) -> Tuple[ReviewResult, bool]:
+        """Parse a reply with the strictest parser its response mode allows.
+        
+        Also returns whether the reply decoded as a JSON review; a fallback
+        summary of free-form text (a refusal, a truncated reply) is not cached.
+        """
+        if self.supports_structured_output:
+            # The schema is enforced by the provider; anything else is a hard error
+            return _review_from_data(_json_loads(content), content), True
+        try:
+            return self._decode_response(content), True
+        except ValueError:
+            return _fallback_review(content), False
+    
+    async def _parse_async(self, content: str) -> Tuple[ReviewResult, bool]:
+        """Parse a reply without stalling other reviews on the event loop."""
+        # Small replies parse faster than a thread hop; only offload big ones
+        if len(content) < REVIEW_THREADED_PARSE_MIN_SIZE:
+            return self._parse(content)
+        return await asyncio.to_thread(self._parse, content)
+    
+    async def _cached_review(
+        self, key: str, refresh_cache: Optional[bool]
+    ) -> Optional[ReviewResult]:
+        """Return the cached review for key, or None when there is none to reuse."""
+        if refresh_cache is None:
+            refresh_cache = self.refresh_cache
+        if not self.cache or refresh_cache:
+            return None
+        try:
+            cached = self.cache.get(key)
+        except OSError:
+            # The cache is only an optimization; an unreadable one is a miss
+            return None
+        if cached is None:
+            return None
+        
+        result, decoded = await self._parse_async(cached)
+        # Older versions cached free-form replies too; fetch a fresh review instead
+        return result if decoded else None
+    
+    def _store(self, key: str, content: str) -> None:
+        """Cache a reply that decoded as a JSON review."""
+        if not self.cache:
+            return
+        try:
+            self.cache.set(key, content)
+        except OSError:
+            # A read-only or full cache must not cost the review just paid for
+            pass
+    
+    async def review(
         self,
         diff: str,
         change_summary: str = "",
         revision_summary: str = "",
+        refresh_cache: Optional[bool] = None,
     ) -> ReviewResult:
-        """Review a code diff and return structured feedback."""
+        """Review a code diff and return structured feedback.
+        
+        refresh_cache overrides the reviewer's setting for this review.
+        """
         user_prompt = build_user_prompt(diff, change_summary, revision_summary)
+        key = self._cache_key(user_prompt) if self.cache else ""
+        cached = await self._cached_review(key, refresh_cache)
+        if cached is not None:
+            return cached
         
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": user_prompt},
-        ]
-        
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-        )
-        
-        content = response.choices[0].message.content or ""
-        
-        return self._parse_response(content)
-    
-    def _parse_response(self, content: str) -> ReviewResult:
-        """Parse the LLM response into a structured ReviewResult."""
-        # Try to extract JSON from the response
-        text = content.strip()
-        
-        # Handle markdown code blocks
-        if text.startswith("```"):
-            # Remove opening fence
-            text = text.lstrip("`")
-            if text.startswith("json"):
-                text = text[4:]
-            elif text.startswith("JSON"):
-                text = text[4:]
-            text = text.strip()
-            # Remove closing fence
-            if text.endswith("```"):
-                text = text[:-3].strip()
+        content = "".join([delta async for delta in self._stream_content(user_prompt)])
+        result, decoded = await self._parse_async(content)
+        if decoded:
+            self._store(key, content)
+        return result
+    
+    async def review_stream(
+        self,
+        diff: str,
+        change_summary: str = "",
+        revision_summary: str = "",
+        refresh_cache: Optional[bool] = None,
+    ) -> AsyncIterator[RequestedChange]:
+        """Review a code diff, yielding each requested change as soon as it is complete."""
+        user_prompt = build_user_prompt(diff, change_summary, revision_summary)
+        key = self._cache_key(user_prompt) if self.cache else ""
+        cached = await self._cached_review(key, refresh_cache)
+        if cached is not None:
+            for change in cached.requested_changes:
+                yield change
+            return
         
-        try:
-            data = json.loads(text)
-            
-            summary = data.get("summary", [])
-            if isinstance(summary, str):
-                summary = [summary]
-            
-            requested_changes = []
-            for rc in data.get("requested_changes", []):
-                requested_changes.append(
-                    RequestedChange(
-                        path=rc.get("path", ""),
-                        line=rc.get("line", ""),
-                        change=rc.get("change", ""),
+        parser = _ChangeStreamParser()
+        async for delta in self._stream_content(user_prompt):
+            for change in parser.feed(delta):
+                yield change
+        
+        content = parser.text
+        _, decoded = await self._parse_async(content)
+        if decoded:
+            self._store(key, content)
+    
+    async def review_many(
+        self,
+        items: List[dict],
+        max_concurrency: int = REVIEW_MAX_CONCURRENCY,
+    ) -> List[ReviewResult | BaseException]:
+        """Review several diffs concurrently.
+        
+        Each item holds the keyword arguments for review(). Results come back
+        in input order; a failed review yields its exception instead.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run(item: dict) -> ReviewResult:
+            async with semaphore:
+                return await self.review(**item)
+        
+        return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+    
+    async def serve_forever(
+        self,
+        queue: "asyncio.Queue[ReviewJob]",
+        max_concurrency: int = REVIEW_MAX_CONCURRENCY,
+    ) -> None:
+        """Review jobs from queue until cancelled.
+        
+        A long-lived worker keeps the connection pool and response cache
+        warm across reviews instead of rebuilding them per run.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        tasks = set()
+        
+        async def handle(job: ReviewJob) -> None:
+            try:
+                async with semaphore:
+                    result = await self.review(
+                        job.diff,
+                        job.change_summary,
+                        job.revision_summary,
+                        refresh_cache=not job.use_cache,
                     )
-                )
-            
-            return ReviewResult(
-                summary=summary,
-                requested_changes=requested_changes,
-                raw_response=content,
-            )
-        except json.JSONDecodeError:
-            # Fallback: treat the entire response as a summary
-            return ReviewResult(
-                summary=[content] if content else ["(model returned empty response)"],
-                requested_changes=[],
-                raw_response=content,
-            )
+            except asyncio.CancelledError:
+                job.reply.cancel()
+                raise
+            except Exception as e:
+                if not job.reply.done():
+                    job.reply.set_exception(e)
+            else:
+                if not job.reply.done():
+                    job.reply.set_result(result)
+            finally:
+                queue.task_done()
+        
+        try:
+            while True:
+                job = await queue.get()
+                task = asyncio.create_task(handle(job))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def review_sync(
+        self,
+        diff: str,
+        change_summary: str = "",
+        revision_summary: str = "",
+    ) -> ReviewResult:
+        """Blocking wrapper around review() for synchronous callers."""
+        return self._get_runner().run(self.review(diff, change_summary, revision_summary))
+    
+    def close(self) -> None:
+        """Close this reviewer's client and the event loop used by review_sync()."""
+        if self._runner is None:
+            return
+        self._runner.run(self.aclose())
+        self._runner.close()
+        self._runner = None
+    
+    def _decode_response(self, content: str) -> ReviewResult:
+        """Decode a JSON reply, optionally fenced, into a ReviewResult.
+        
+        Raises ValueError when the reply is not a JSON review.
+        """
+        if self.supports_json_mode:
+            # JSON mode replies are bare JSON; skip the fence scan when they are
+            try:
+                return _review_from_data(_json_loads(content), content)
+            except ValueError:
+                pass
+        
+        return _review_from_data(_json_loads(_unwrap_fence(content)), content)